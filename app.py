@@ -1,19 +1,50 @@
 import os
-import base64
-import requests
+import hashlib
+import logging
 import queue
+import re
 import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from string import Template
 import streamlit as st
 from streamlit.components.v1 import html as st_html
-from dotenv import load_dotenv
 from streamlit_webrtc import webrtc_streamer, WebRtcMode
 
 import data
-from backend.schemas import AuraUIPayload, DDxEntry, DiseaseQuestions
+from backend.schemas import (
+    AuraUIPayload, DDxEntry, DiseaseQuestions, QuestionTarget, escape_html,
+)
 from backend.main_agent import AuraPipeline
 from backend.audio_processing import AudioStreamingProcessor
 
-load_dotenv()
+# .env is loaded once, on import, by the backend modules above
+
+
+def _configure_logging() -> None:
+    """
+    Route this app's and the backend's loggers to stderr at LOG_LEVEL.
+
+    Only these loggers are touched, so third-party INFO chatter (httpx request
+    lines, …) stays off the console.  INFO by default, and on an unrecognised
+    LOG_LEVEL; set LOG_LEVEL=DEBUG to see full pipeline payloads.
+    """
+    level = logging.getLevelName(os.getenv("LOG_LEVEL", "INFO").upper())
+    if not isinstance(level, int):
+        level = logging.INFO
+    for name in ("backend", __name__):
+        log = logging.getLogger(name)
+        log.setLevel(level)
+        # The script re-executes on every rerun — attach the handler once
+        if not log.handlers:
+            handler = logging.StreamHandler()
+            handler.setFormatter(logging.Formatter("%(levelname)s %(name)s: %(message)s"))
+            log.addHandler(handler)
+
+
+_configure_logging()
+logger = logging.getLogger(__name__)
 
 # ── DDx merge helpers ─────────────────────────────────────────────────────────
 _SUSPICION_RANK = {
@@ -24,13 +55,32 @@ _SUSPICION_RANK = {
 DDX_MAX = 5   # Maximum number of DDx entries to keep at any time
 
 
+def _ddx_key(entry: DDxEntry) -> str:
+    """Normalised disease name used to key the running DDx."""
+    return entry.disease.lower().strip()
+
+
+def _ddx_signature(entries) -> frozenset:
+    """Cheap identity of a DDx list: (disease, suspicion, probability) per entry."""
+    return frozenset(
+        (_ddx_key(e), e.suspicion.value, round(e.probability_pct, 1))
+        for e in entries
+    )
+
+
 def _merge_ddx(
-    existing: list,
+    ddx_by_condition: dict,
     incoming: list,
     max_entries: int = DDX_MAX,
 ) -> list:
     """
-    Merge two DDx lists without ever cancelling an existing diagnosis.
+    Merge a new DDx into the running one without ever cancelling an existing
+    diagnosis.
+
+    *ddx_by_condition* maps normalised disease name → DDxEntry and is
+    updated in place, so a tick costs O(len(incoming)) dict operations
+    instead of re-indexing the whole DDx.  Returns the merged entries
+    ranked by confidence (the list stored on the UI payload).
 
     Rules
     -----
@@ -42,54 +92,408 @@ def _merge_ddx(
        priority) is removed.  Only removes one entry per call so the list
        converges gradually rather than jumping.
     4. Ranks are re-numbered 1..N after every merge.
+
+    Fast path: when *incoming* is empty or carries exactly the same
+    diseases / suspicion / probability as the running DDx (the steady state
+    between pipeline runs), nothing is touched.
     """
-    # Index existing entries by normalised disease name
-    merged: dict[str, DDxEntry] = {
-        e.disease.lower().strip(): e for e in existing
-    }
+    if not incoming or _ddx_signature(incoming) == _ddx_signature(ddx_by_condition.values()):
+        return sorted(ddx_by_condition.values(), key=lambda e: e.rank)
 
     for new_entry in incoming:
-        key = new_entry.disease.lower().strip()
-        if key in merged:
+        key = _ddx_key(new_entry)
+        current = ddx_by_condition.get(key)
+        if current is not None:
             # Always update probability_pct and supporting evidence;
             # update suspicion level if the new signal differs.
             updates = {
                 "probability_pct": new_entry.probability_pct,
-                "key_supporting": new_entry.key_supporting or merged[key].key_supporting,
+                "key_supporting": new_entry.key_supporting or current.key_supporting,
             }
-            old_rank = _SUSPICION_RANK.get(merged[key].suspicion.value, 0)
+            old_rank = _SUSPICION_RANK.get(current.suspicion.value, 0)
             new_rank = _SUSPICION_RANK.get(new_entry.suspicion.value, 0)
             if new_rank != old_rank:
                 updates["suspicion"] = new_entry.suspicion
-            merged[key] = merged[key].model_copy(update=updates)
+            ddx_by_condition[key] = current.model_copy(update=updates)
         else:
             # Brand-new disease — append
-            merged[key] = new_entry
-
-    result = list(merged.values())
-
-    # Enforce cap: drop oldest entry with lowest confidence when over limit
-    while len(result) > max_entries:
-        # Sort ascending by confidence so the weakest candidate is first;
-        # among ties, the one with the highest rank number (added earliest /
-        # ranked lowest) is chosen for removal.
-        result.sort(
-            key=lambda e: (
-                e.confidence,
-                -e.rank,
-            )
-        )
-        result.pop(0)   # remove the lowest-confidence / oldest entry
+            ddx_by_condition[key] = new_entry
+
+    # Enforce cap: drop the weakest candidate when over limit; among ties,
+    # the one with the highest rank number (added earliest / ranked lowest).
+    while len(ddx_by_condition) > max_entries:
+        weakest = min(ddx_by_condition.values(), key=lambda e: (e.confidence, -e.rank))
+        del ddx_by_condition[_ddx_key(weakest)]
 
     # Re-number ranks 1..N sorted by confidence descending
-    result.sort(key=lambda e: e.confidence, reverse=True)
+    result = sorted(ddx_by_condition.values(), key=lambda e: e.confidence, reverse=True)
     for i, entry in enumerate(result, start=1):
-        entry = entry.model_copy(update={"rank": i})
-        result[i - 1] = entry
+        if entry.rank != i:
+            entry = entry.model_copy(update={"rank": i})
+            ddx_by_condition[_ddx_key(entry)] = entry
+            result[i - 1] = entry
 
     return result
 
 
+# ── Live loop pacing ──────────────────────────────────────────────────────────
+PIPELINE_INTERVAL_S = 10.0  # quiet speech: run once this long has passed
+PIPELINE_BURST_CHARS = 200  # dense speech: run as soon as this much is new
+PIPELINE_DEBOUNCE_S = 0.5   # quiet-speech runs wait for this long a lull
+PIPELINE_MIN_CHARS = 15     # shorter pending text needs a clinical cue to run
+
+# Clinically salient cues: a short utterance containing one of these is worth
+# a run on its own; short fillers ("uh-huh", "yes", "okay") are not.
+_SALIENT = re.compile(
+    # Stems match any inflection ("coughing", "nauseous", "allergic")…
+    r"\b(?:pain|ache|fever|cough|breath|nause|vomit|dizz|rash|bleed|swell|"
+    r"allerg|medic|smok|alcohol|pregnan)"
+    # …whole words must end on a boundary ("no" is not "now" or "normal")
+    r"|\b(?:doses?|mg|pills?|tablets?|drugs?|days?|weeks?|months?|years?|"
+    r"since|worse|better|no|not|never)\b",
+    re.IGNORECASE,
+)
+QUEUE_WAIT_S = 5.0          # longest a blocking read waits for new speech
+FUTURE_POLL_S = 0.5         # read timeout while a pipeline run is in flight
+
+
+# ── Transcript window ─────────────────────────────────────────────────────────
+TRANSCRIPT_MAX_CHARS = 20_000   # longest transcript handed to the pipeline
+TRANSCRIPT_TRIM_TO = 15_000     # trim well below the cap so it isn't hit every tick
+
+
+def _trim_transcript() -> None:
+    """
+    Drop the oldest segments once the transcript outgrows TRANSCRIPT_MAX_CHARS.
+
+    Older speech is not lost: triage has already merged it into the running
+    PatientHistory, which the pipeline carries from run to run and which acts
+    as the rolling summary of everything trimmed here.
+    """
+    if len(st.session_state.transcript_str) <= TRANSCRIPT_MAX_CHARS:
+        return
+    segments: deque = st.session_state.transcript
+    size = len(st.session_state.transcript_str)
+    while len(segments) > 1 and size > TRANSCRIPT_TRIM_TO:
+        size -= len(segments.popleft())
+    st.session_state.transcript_str = "".join(segments)
+
+
+# ── AI panel card templates ───────────────────────────────────────────────────
+# Single-line markup: sections are joined into one st.markdown, and indented
+# multi-line literals would not dedent cleanly once concatenated.
+# One card template per severity class, with the class baked in at import;
+# rows fill (disease, pct, confidence) positionally via %-formatting.
+_DDX_CARD_TPLS = {
+    cls: (
+        f'<div class="ddx-card {cls}">'
+        '<div style="display:flex; flex-direction:column; gap:0.25rem;">'
+        '<span class="condition">%s</span>'
+        '<span class="ddx-prob">%.1f%%</span>'
+        '</div>'
+        f'<span class="ddx-badge {cls}">%.1f</span>'
+        '</div>'
+    )
+    for cls in ("high", "medium", "low")
+}
+_DDX_EMPTY_HTML = (
+    '<div class="ddx-card low" style="opacity:.4; cursor:default">'
+    '<span class="condition" style="color:#94a3b8; font-weight:400">'
+    'Awaiting transcript data…</span>'
+    '</div>'
+)
+
+
+@st.cache_data(show_spinner=False, max_entries=64)
+def _ddx_cards_html(cards: tuple[tuple[str, str, float, float], ...]) -> str:
+    """
+    Render the DDx section from ``(cls, disease_html, pct, confidence)`` rows.
+
+    Memoized across reruns and sessions: redrawing a top-3 seen before skips
+    the format loop.
+    """
+    if not cards:
+        return _DDX_EMPTY_HTML
+    return "".join(
+        _DDX_CARD_TPLS[cls] % (disease, pct, confidence)
+        for cls, disease, pct, confidence in cards
+    )
+
+
+_GAP_HEADER_HTML = '<div class="clinical-gap-header"><span>💡</span> Clinical Gap Identified</div>'
+_GAP_CARD_TPL = '<div class="clinical-gap-card"><p>{text}</p></div>'
+_GAP_EMPTY_HTML = (
+    '<div class="clinical-gap-card" style="opacity:.5">'
+    '<p>Clinical gaps will appear here as the consultation progresses.</p>'
+    '</div>'
+)
+_SAFETY_HEADER_HTML = '<div class="clinical-gap-header"><span>⚠️</span> Safety Review</div>'
+_SAFETY_CARD_TPL = '<div class="ddx-card high"><span class="condition">{issue}</span></div>'
+
+_Q_TMPL = Template(
+    '<div class="dq-q" style="background:$bg;border-color:$border;">'
+    '<div class="dq-q-text" style="color:$fg;">$question</div>'
+    '<div class="dq-q-rationale">$rationale</div>'
+    '<span class="dq-q-tag" style="color:$fg;">$label</span>'
+    '</div>'
+)
+
+# ── Patient badge / profile templates ────────────────────────────────────────
+_BADGE_TMPL = Template(
+    '<div style="text-align:right; color:#0369a1; font-weight:700; font-size:0.95rem; '
+    'padding-top:1rem; background:rgba(224,242,254,0.6); border:1px solid #bae6fd; '
+    'border-radius:0.6rem; padding:0.5rem 0.9rem; display:inline-block; '
+    'backdrop-filter:blur(8px);">🩺 $name</div>'
+)
+_BADGE_LISTENING_HTML = (
+    '<div style="text-align:right; color:#7dd3fc; font-style:italic; font-size:0.82rem; '
+    'padding-top:1rem; letter-spacing:0.04em;">⟳ Listening for patient name…</div>'
+)
+_PH_SECTION_TMPL = Template(
+    '<div><div class="ph-label">$label</div><div class="ph-chips">$chips</div></div>'
+)
+
+# (background, text, border) per question target
+_TARGET_COLORS = {
+    QuestionTarget.RULE_IN:       ("#dcfce7", "#166534", "#86efac"),
+    QuestionTarget.RULE_OUT:      ("#fff1f2", "#9f1239", "#fecdd3"),
+    QuestionTarget.DIFFERENTIATE: ("#e0f2fe", "#0369a1", "#7dd3fc"),
+}
+_DEFAULT_TARGET_COLORS = ("#f1f5f9", "#334155", "#e2e8f0")
+_TARGET_LABELS = {t: t.value.replace("_", " ") for t in QuestionTarget}
+
+# ── Background pipeline runs ──────────────────────────────────────────────────
+def _transcript_hash(text: str) -> bytes:
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def _start_analysis(full_transcript: str) -> bool:
+    """
+    Start a pipeline run on *full_transcript* without blocking the UI loop.
+
+    The run is submitted to the session's single-worker executor; pick the
+    payload up with :func:`_collect_analysis` on a later tick.  A transcript
+    byte-identical to the last one analysed is skipped outright; returns
+    whether a run was actually submitted.  Payloads
+    are not cached beyond that: AuraPipeline is stateful, so an older
+    payload for the same text may predate the current history.
+    """
+    h = _transcript_hash(full_transcript)
+    if h == st.session_state.last_transcript_hash:
+        return False
+    st.session_state.last_transcript_hash = h
+
+    # str is immutable, so the worker sees a snapshot — later appends to
+    # transcript_str don't leak into this run.
+    st.session_state.pipeline_future = st.session_state.pipeline_executor.submit(
+        st.session_state.pipeline.run, full_transcript
+    )
+    return True
+
+
+def _collect_analysis() -> AuraUIPayload | None:
+    """Return the background run's payload once it has finished, else None."""
+    future = st.session_state.pipeline_future
+    if future is None or not future.done():
+        return None
+    st.session_state.pipeline_future = None
+    payload = future.result()
+    if future is st.session_state.ddx_replace_future:
+        # The post-switch re-run has landed: its DDx replaces the old
+        # differential rather than merging into it.  Without one
+        # (updateUi=False) the old DDx is kept and later runs merge as usual.
+        st.session_state.ddx_replace_future = None
+        if payload.updateUi:
+            st.session_state.ddx_by_condition = {}
+    return payload
+
+
+# ── Record button ─────────────────────────────────────────────────────────────
+@st.cache_data(show_spinner=False)
+def _record_button_html(is_recording: bool) -> str:
+    """
+    Markup + script for the native record button that drives the hidden
+    WebRTC START button.  Only two variants exist (idle / recording), so each
+    is built once per process and every rerun ships an identical string.
+    """
+    # Conditional styles based on fresh recording state
+    button_inner_radius = "8px" if is_recording else "50%"
+    button_inner_size = "24px" if is_recording else "32px"
+    pulse_animation = "animation: pulse-ring 2s cubic-bezier(0.215, 0.61, 0.355, 1) infinite;" if is_recording else ""
+    hover_scale = "1" if is_recording else "1.05"
+
+    return f"""
+    <div class="btn-container">
+        <button id="aura-trigger" class="aura-record-btn" aria-label="Start Recording">
+            <div class="aura-record-inner"></div>
+        </button>
+    </div>
+    
+    <script>
+    // Remember the WebRTC iframe once found; only rescan the parent document
+    // when it has been detached (e.g. Streamlit remounted the component).
+    let webrtcFrame = null;
+    function findWebRTCFrame() {{
+        if (webrtcFrame && webrtcFrame.isConnected) return webrtcFrame;
+        webrtcFrame = null;
+        const iframes = window.parent.document.querySelectorAll('iframe');
+        for (let iframe of iframes) {{
+            if (iframe.title && iframe.title.includes('webrtc')) {{
+                webrtcFrame = iframe;
+                break;
+            }}
+        }}
+        return webrtcFrame;
+    }}
+
+    // Actively seek out the WebRTC iframe and hide its container completely
+    function hideWebRTCNative() {{
+        const iframe = findWebRTCFrame();
+        if (!iframe || !iframe.parentElement) return;
+        const style = iframe.parentElement.style;
+        if (style.left === '-9999px') return;   // already hidden
+        style.position = 'absolute';
+        style.opacity = '0';
+        style.pointerEvents = 'none';
+        style.height = '1px';
+        style.width = '1px';
+        style.overflow = 'hidden';
+        style.left = '-9999px';
+    }}
+    hideWebRTCNative();
+    setInterval(hideWebRTCNative, 500);
+
+    document.getElementById('aura-trigger').addEventListener('click', function() {{
+        const iframe = findWebRTCFrame();
+        if (!iframe) return;
+        try {{
+            const doc = iframe.contentDocument || iframe.contentWindow.document;
+            if (!doc) return;
+            const btns = doc.querySelectorAll('button');
+            if (btns.length > 0) btns[0].click();
+        }} catch (e) {{}}
+    }});
+    </script>
+    
+    <style>
+    body {{ background: transparent !important; margin: 0; overflow: hidden; padding: 10px; }}
+    
+    @keyframes pulse-ring {{
+        0% {{ box-shadow: 0 0 0 0 rgba(239, 68, 68, 0.4); }}
+        70% {{ box-shadow: 0 0 0 20px rgba(239, 68, 68, 0); }}
+        100% {{ box-shadow: 0 0 0 0 rgba(239, 68, 68, 0); }}
+    }}
+
+    .aura-record-btn {{
+        width: 72px; 
+        height: 72px; 
+        border-radius: 50%; 
+        background: #ffffff;
+        border: 5px solid #1e293b; 
+        cursor: pointer; 
+        padding: 0; 
+        margin: 10px auto;
+        display: flex; 
+        align-items: center; 
+        justify-content: center; 
+        transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1);
+        {pulse_animation}
+    }}
+
+    .aura-record-inner {{
+        width: {button_inner_size}; 
+        height: {button_inner_size}; 
+        border-radius: {button_inner_radius};
+        background: #ef4444; 
+        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
+    }}
+
+    .aura-record-btn:hover {{ 
+        box-shadow: 0 0 0 6px rgba(239,68,68,0.15); 
+        transform: scale({hover_scale}); 
+    }}
+    
+    .btn-container {{ 
+        display: flex; 
+        justify-content: center; 
+        width: 100%; 
+        height: 100%; 
+        align-items: center; 
+    }}
+    </style>
+    """
+
+
+# ── Patient identification ────────────────────────────────────────────────────
+@st.cache_data(show_spinner=False, max_entries=256)
+def _match_patient_id(extracted_name: str, name_index: tuple) -> str | None:
+    """
+    Resolve a name heard in the consultation against (db_name, id) pairs.
+
+    A patient matches when either name contains the other or the first
+    names agree.  Memoised because the same extracted name is re-checked on
+    every pipeline tick until a patient is identified.
+    """
+    extracted_first = extracted_name.split()[0] if extracted_name else ""
+    return next(
+        (
+            pid for db_name, pid in name_index
+            if extracted_name in db_name
+            or db_name in extracted_name
+            or db_name.split()[0] == extracted_first
+        ),
+        None,
+    )
+
+
+# Patient records are read from JSON on disk; cache them across reruns and
+# sessions (the TTL picks up edits to the mock patient files).
+@st.cache_data(ttl=300, show_spinner=False)
+def _all_patients() -> list[dict]:
+    return data.get_all_patients()
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _patient_by_id(patient_id: str | None) -> dict | None:
+    return data.get_patient_by_id(patient_id)
+
+
+@st.cache_data(ttl=300, show_spinner=False)
+def _patient_name_index() -> tuple[tuple[str, str], ...]:
+    """(lower-cased name, id) pairs for identification, built once per process."""
+    return tuple(
+        (p["name"].lower(), p.get("id"))
+        for p in _all_patients() if p.get("name")
+    )
+
+
+@st.cache_data(show_spinner=False)
+def _patient_summary(patient_id: str) -> str:
+    """
+    Prose header for a patient's relevant_history: identity, allergies and
+    past visits from their record.  Cached per id — the record only changes
+    when a different patient is identified.
+    """
+    patient = _patient_by_id(patient_id)
+    if not patient:
+        return ""
+    parts = [f"**{patient.get('name', 'Unknown')}** ({patient.get('age', 'N/A')} {patient.get('gender', 'N/A')}). "]
+    if patient.get("allergies") and patient["allergies"] != ["None"]:
+        parts.append(f"Allergies: {', '.join(patient['allergies'])}. ")
+    # Include past visit history for cross-visit intelligence
+    past_visits = patient.get("past_visits", [])
+    if past_visits:
+        parts.append("Previous visits: ")
+        parts.extend(
+            f"[{visit.get('date', 'N/A')}] "
+            f"{visit.get('chief_complaint', '')} → "
+            f"Dx: {visit.get('diagnosis', '')}. "
+            f"Tx: {visit.get('treatment', '')}. "
+            for visit in past_visits
+        )
+    return "".join(parts)
+
+
 st.set_page_config(
     page_title="Aura - Clinical Decision Support",
     page_icon="🩺",
@@ -98,35 +502,37 @@ st.set_page_config(
 )
 
 if "transcript" not in st.session_state:
-    st.session_state.transcript = []
+    # Recent segments only — see _trim_transcript
+    st.session_state.transcript = deque()
+if "transcript_str" not in st.session_state:
+    # Running concatenation of `transcript`, appended in place as segments
+    # arrive so the pipeline never re-joins the whole consultation.
+    st.session_state.transcript_str = ""
 if "ai_analysis" not in st.session_state:
     st.session_state.ai_analysis = AuraUIPayload()
+if "ddx_by_condition" not in st.session_state:
+    # Running DDx keyed by normalised disease name — merged into in place
+    st.session_state.ddx_by_condition = {}
+if "ddx_replace_future" not in st.session_state:
+    # The re-run started on a patient switch; its DDx replaces the dict
+    st.session_state.ddx_replace_future = None
 if "current_patient_id" not in st.session_state:
     st.session_state.current_patient_id = None
-
-active_patient = data.get_patient_by_id(st.session_state.current_patient_id)
+if "patient_name_index" not in st.session_state:
+    # Shared across sessions via st.cache_data; pinned per session so
+    # identification keeps matching against one roster snapshot
+    st.session_state.patient_name_index = _patient_name_index()
 
 if "patient_history" not in st.session_state:
     from backend.schemas import PatientHistory as _PH
     # Seed the PatientHistory object with the JSON data
+    active_patient = _patient_by_id(st.session_state.current_patient_id)
     ph = _PH()
     if active_patient:
         ph.symptoms = []
         ph.risk_factors = active_patient.get("past_medical_history", [])
         ph.medications = active_patient.get("current_medications", [])
-        ph.relevant_history = f"**{active_patient.get('name', 'Unknown')}** ({active_patient.get('age', 'N/A')} {active_patient.get('gender', 'N/A')}). "
-        if active_patient.get("allergies") and active_patient["allergies"] != ["None"]:
-            ph.relevant_history += f"Allergies: {', '.join(active_patient['allergies'])}. "
-        past_visits = active_patient.get("past_visits", [])
-        if past_visits:
-            ph.relevant_history += "Previous visits: "
-            for visit in past_visits:
-                ph.relevant_history += (
-                    f"[{visit.get('date', 'N/A')}] "
-                    f"{visit.get('chief_complaint', '')} → "
-                    f"Dx: {visit.get('diagnosis', '')}. "
-                    f"Tx: {visit.get('treatment', '')}. "
-                )
+        ph.relevant_history = _patient_summary(st.session_state.current_patient_id)
     st.session_state.patient_history = ph
 
 if "pipeline" not in st.session_state:
@@ -139,364 +545,42 @@ if "was_playing" not in st.session_state:
     st.session_state.was_playing = False
 if "last_pipeline_run" not in st.session_state:
     st.session_state.last_pipeline_run = 0.0
-if "transcript_changed_since_llm" not in st.session_state:
-    st.session_state.transcript_changed_since_llm = False
+if "last_speech_at" not in st.session_state:
+    st.session_state.last_speech_at = 0.0
+if "salient_since_llm" not in st.session_state:
+    st.session_state.salient_since_llm = False
+if "chars_since_llm" not in st.session_state:
+    st.session_state.chars_since_llm = 0
+if "last_transcript_hash" not in st.session_state:
+    st.session_state.last_transcript_hash = b""
+if "pipeline_executor" not in st.session_state:
+    # One worker: pipeline runs are serialised, but never block audio ingest
+    st.session_state.pipeline_executor = ThreadPoolExecutor(
+        max_workers=1, thread_name_prefix="aura-pipeline"
+    )
+    # Queued ahead of any run on the same worker, so the connection warm-up
+    # shares the pipeline's loop without delaying first paint
+    st.session_state.pipeline_executor.submit(st.session_state.pipeline.warm_up)
+    st.session_state.pipeline_future = None
+# Bumped whenever patient_history / ai_analysis change so the live loop can
+# redraw just the affected panel instead of rerunning the whole script.
+if "ph_version" not in st.session_state:
+    st.session_state.ph_version = 0
+if "ai_version" not in st.session_state:
+    st.session_state.ai_version = 0
 
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  CSS — Pixel-perfect match to the React/Tailwind source
 # ══════════════════════════════════════════════════════════════════════════════
-st.markdown("""
-<style>
-/* ── Fonts ─────────────────────────────────────────────────────────────────── */
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap');
-
-/* ── Global Reset ──────────────────────────────────────────────────────────── */
-html, body, * , [class*="css"] {
-    font-family: 'Inter', -apple-system, BlinkMacSystemFont, 'Segoe UI', sans-serif !important;
-}
-
-/* Clinical light-blue background */
-.stApp { background: linear-gradient(155deg, #f0f9ff 0%, #e0f2fe 45%, #f8fafc 100%) !important; min-height: 100vh; }
+@st.cache_resource(show_spinner=False)
+def _load_css() -> str:
+    """Read the stylesheet once per process rather than re-parsing it each rerun."""
+    return (Path(__file__).parent / "static" / "aura.css").read_text(encoding="utf-8")
 
-/* ── Hide Streamlit chrome ─────────────────────────────────────────────────── */
-[data-testid="stSidebar"]      { display: none !important; }
-[data-testid="stHeader"]       { display: none !important; }
-#MainMenu, footer              { visibility: hidden; }
-[data-testid="stIconMaterial"] { display: none !important; }
-.stMarkdown h3                 { display: none; }
 
-/* max-w-7xl mx-auto */
-.block-container {
-    padding: 2rem 2.5rem !important;
-    max-width: 1280px;
-}
-
-/* ── Header ────────────────────────────────────────────────────────────────── */
-.aura-header h1 {
-    font-size: 2rem;
-    font-weight: 800;
-    background: linear-gradient(135deg, #0369a1 0%, #38bdf8 100%);
-    -webkit-background-clip: text;
-    -webkit-text-fill-color: transparent;
-    background-clip: text;
-    letter-spacing: -0.04em;
-    margin: 0; padding: 0; line-height: 1.2;
-}
-.aura-subtitle {
-    color: #7dd3fc;
-    font-size: 0.72rem;
-    font-weight: 600;
-    margin-top: 5px;
-    letter-spacing: 0.16em;
-    text-transform: uppercase;
-}
-
-/* ── Section Titles ────────────────────────────────────────────────────────── */
-.section-title {
-    font-size: 0.68rem;
-    font-weight: 700;
-    color: #0369a1;
-    margin-bottom: 0.85rem;
-    letter-spacing: 0.13em;
-    text-transform: uppercase;
-    display: flex;
-    align-items: center;
-    gap: 0.45rem;
-}
-.section-title::before {
-    content: \'\';
-    display: inline-block;
-    width: 3px; height: 14px;
-    background: linear-gradient(180deg, #38bdf8, #0369a1);
-    border-radius: 2px;
-    flex-shrink: 0;
-}
-
-/* ── Patient History Panel (frosted glass) ─────────────────────────────────── */
-.ph-panel {
-    background: rgba(255,255,255,0.82);
-    backdrop-filter: blur(16px);
-    -webkit-backdrop-filter: blur(16px);
-    border: 1px solid rgba(186,230,253,0.8);
-    border-radius: 1.1rem;
-    padding: 1.5rem;
-    min-height: 380px;
-    overflow-y: auto;
-    box-shadow: 0 1px 3px rgba(14,165,233,0.07), 0 8px 24px rgba(14,165,233,0.06);
-    display: flex;
-    flex-direction: column;
-    gap: 1.25rem;
-}
-
-/* section label */
-.ph-label {
-    font-size: 0.64rem;
-    font-weight: 700;
-    letter-spacing: 0.12em;
-    text-transform: uppercase;
-    color: #38bdf8;
-    margin-bottom: 0.4rem;
-}
-
-/* symptom / risk chips */
-.ph-chips { display: flex; flex-wrap: wrap; gap: 0.4rem; }
-.ph-chip {
-    display: inline-flex;
-    align-items: center;
-    gap: 0.25rem;
-    padding: 0.2rem 0.7rem;
-    border-radius: 9999px;
-    font-size: 0.77rem;
-    font-weight: 500;
-    border: 1px solid;
-    line-height: 1.4;
-}
-.ph-chip.symptom   { background: #e0f2fe; color: #0369a1; border-color: #7dd3fc; }
-.ph-chip.negated   { background: #f1f5f9; color: #94a3b8; border-color: #e2e8f0; text-decoration: line-through; }
-.ph-chip.risk      { background: #fff7ed; color: #c2410c; border-color: #fed7aa; }
-.ph-chip.med       { background: #f0fdf4; color: #166534; border-color: #86efac; }
-
-/* meta row (duration / severity) */
-.ph-meta-row { display: flex; gap: 1rem; flex-wrap: wrap; }
-.ph-meta-pill {
-    display: inline-flex;
-    align-items: center;
-    gap: 0.35rem;
-    background: #f0f9ff;
-    border: 1px solid #bae6fd;
-    border-radius: 0.5rem;
-    padding: 0.3rem 0.75rem;
-    font-size: 0.8rem;
-    color: #0369a1;
-    font-weight: 500;
-}
-.ph-meta-pill strong { color: #0c4a6e; }
-
-/* history prose box */
-.ph-history-box {
-    background: #f0f9ff;
-    border-left: 3px solid #0ea5e9;
-    border-radius: 0 0.5rem 0.5rem 0;
-    padding: 0.75rem 1rem;
-    font-size: 0.875rem;
-    color: #0c4a6e;
-    line-height: 1.65;
-    font-style: italic;
-}
-
-/* listening pulse dot */
-@keyframes ph-pulse {
-    0%, 100% { opacity: 1; }
-    50%       { opacity: 0.3; }
-}
-.ph-live-dot {
-    width: 8px; height: 8px; border-radius: 50%;
-    background: #ef4444;
-    display: inline-block;
-    animation: ph-pulse 1.4s ease-in-out infinite;
-    margin-right: 6px;
-    vertical-align: middle;
-}
-
-/* Empty state */
-.empty-state {
-    text-align: center;
-    padding: 5rem 1.5rem;
-    color: #7dd3fc;
-    font-size: 0.88rem;
-    line-height: 1.6;
-    flex: 1;
-    display: flex;
-    flex-direction: column;
-    align-items: center;
-    justify-content: center;
-}
-.empty-state .icon { font-size: 2.2rem; margin-bottom: 0.75rem; }
-
-/* ── Form Input ────────────────────────────────────────────────────────────── */
-.stTextInput > div > div > input {
-    background: rgba(255,255,255,0.92) !important;
-    border: 1px solid #bae6fd !important;
-    border-radius: 0.5rem !important;
-    padding: 0.75rem 1rem !important;
-    font-size: 0.9375rem !important;
-    box-shadow: none !important;
-    color: #0c4a6e !important;
-    transition: all 0.15s ease !important;
-}
-.stTextInput > div > div > input:focus {
-    border-color: transparent !important;
-    box-shadow: 0 0 0 2px #0ea5e9 !important;
-    outline: none !important;
-}
-.stTextInput > div > div,
-.stTextInput > div { border: none !important; box-shadow: none !important; }
-
-/* Form submit button */
-.stFormSubmitButton > button {
-    background: none !important;
-    border: none !important;
-    box-shadow: none !important;
-    color: #0ea5e9 !important;
-    font-size: 1.2rem !important;
-    padding: 0.5rem !important;
-    min-height: 0 !important;
-    transition: all 0.15s ease !important;
-}
-.stFormSubmitButton > button:hover {
-    background: #e0f2fe !important;
-    color: #0369a1 !important;
-    transform: none !important;
-    box-shadow: none !important;
-    border-radius: 0.375rem !important;
-}
-
-/* General button */
-.stButton > button {
-    background: linear-gradient(135deg, #0ea5e9, #0284c7);
-    color: white;
-    border: none; border-radius: 0.5rem;
-    padding: 0.5rem 1.25rem; font-weight: 600; font-size: 0.85rem;
-    transition: all 0.2s ease;
-    box-shadow: 0 2px 8px rgba(14,165,233,0.3);
-    letter-spacing: 0.02em;
-}
-.stButton > button:hover {
-    transform: translateY(-1px);
-    box-shadow: 0 6px 20px rgba(14,165,233,0.4);
-    color: white; border: none;
-}
-
-/* ── DDx Cards ─────────────────────────────────────────────────────────────── */
-.ddx-card {
-    padding: 0.85rem 1rem 0.85rem 1.15rem;
-    border-radius: 0.75rem;
-    border-width: 1px;
-    border-style: solid;
-    margin-bottom: 0.6rem;
-    display: flex;
-    justify-content: space-between;
-    align-items: flex-start;
-    transition: all 0.2s ease;
-    cursor: default;
-    position: relative;
-    overflow: hidden;
-}
-.ddx-card::before {
-    content: \'\';
-    position: absolute;
-    left: 0; top: 0; bottom: 0;
-    width: 4px;
-}
-.ddx-card:hover {
-    transform: translateX(3px);
-    box-shadow: 0 4px 14px rgba(0,0,0,0.07);
-}
-
-/* HIGH — rose/red */
-.ddx-card.high { background: rgba(255,241,242,0.9); border-color: #fecdd3; }
-.ddx-card.high::before { background: linear-gradient(180deg,#f43f5e,#be123c); }
-
-/* MEDIUM — amber */
-.ddx-card.medium { background: rgba(255,251,235,0.9); border-color: #fde68a; }
-.ddx-card.medium::before { background: linear-gradient(180deg,#f59e0b,#d97706); }
-
-/* LOW — sky blue */
-.ddx-card.low { background: rgba(240,249,255,0.9); border-color: #bae6fd; }
-.ddx-card.low::before { background: linear-gradient(180deg,#38bdf8,#0284c7); }
-
-/* Condition name */
-.ddx-card .condition { font-weight: 600; font-size: 0.9rem; }
-.ddx-card.high .condition   { color: #881337; }
-.ddx-card.medium .condition { color: #78350f; }
-.ddx-card.low .condition    { color: #0c4a6e; }
-
-/* Badge */
-.ddx-badge {
-    font-size: 0.68rem;
-    font-weight: 700;
-    padding: 0.18rem 0.55rem;
-    border-radius: 9999px;
-    border-width: 1px;
-    border-style: solid;
-    white-space: nowrap;
-    letter-spacing: 0.03em;
-}
-.ddx-badge.high   { background: #ffe4e6; color: #be123c; border-color: #fecdd3; }
-.ddx-badge.medium { background: #fef3c7; color: #b45309; border-color: #fde68a; }
-.ddx-badge.low    { background: #e0f2fe; color: #0369a1; border-color: #7dd3fc; }
-
-/* ── Clinical Gap ──────────────────────────────────────────────────────────── */
-.clinical-gap-header {
-    font-size: 0.68rem;
-    font-weight: 700;
-    color: #0369a1;
-    margin-top: 1.75rem;
-    margin-bottom: 0.7rem;
-    display: flex;
-    align-items: center;
-    gap: 0.5rem;
-    letter-spacing: 0.12em;
-    text-transform: uppercase;
-}
-.clinical-gap-card {
-    background: linear-gradient(135deg, #f0f9ff 0%, #e0f2fe 100%);
-    border: 1px solid #7dd3fc;
-    border-radius: 0.8rem;
-    padding: 1rem 1.25rem;
-    box-shadow: 0 2px 10px rgba(14,165,233,0.1);
-}
-.clinical-gap-card p,
-.clinical-gap-card {
-    color: #0c4a6e;
-    font-weight: 500;
-    line-height: 1.65;
-    font-size: 0.9rem;
-}
-
-/* ── Mic Button ────────────────────────────────────────────────────────────── */
-.mic-btn {
-    width: 2.75rem; height: 2.75rem;
-    border-radius: 9999px;
-    border: 2px solid #bae6fd;
-    background: #f0f9ff;
-    cursor: pointer;
-    display: flex; align-items: center; justify-content: center;
-    transition: all 0.2s ease;
-    font-size: 1.15rem;
-    flex-shrink: 0;
-}
-.mic-btn:hover {
-    border-color: #0ea5e9;
-    background: #e0f2fe;
-    box-shadow: 0 0 0 3px rgba(14,165,233,0.15);
-}
-.mic-btn.recording {
-    border-color: #ef4444;
-    background: #fef2f2;
-    animation: mic-pulse 1.5s ease-in-out infinite;
-}
-@keyframes mic-pulse {
-    0%, 100% { box-shadow: 0 0 0 0 rgba(239,68,68,0.4); }
-    50%      { box-shadow: 0 0 0 10px rgba(239,68,68,0); }
-}
-.mic-status { font-size: 0.75rem; color: #ef4444; font-weight: 500; margin-top: 2px; text-align: center; }
-
-/* ── Tabs (hide) ───────────────────────────────────────────────────────────── */
-.stTabs [data-baseweb="tab-list"] { display: none; }
-.stTabs [data-baseweb="tab-panel"] { padding-top: 0; }
-
-/* ── Misc Streamlit overrides ──────────────────────────────────────────────── */
-.stAlert { border-radius: 0.75rem; border: none; }
-div[data-testid="stVerticalBlock"] > div[style*="border"] {
-    background: rgba(255,255,255,0.82);
-    border: 1px solid #bae6fd !important;
-    border-radius: 1rem !important;
-    box-shadow: 0 1px 3px rgba(14,165,233,0.08);
-}
-</style>
-""", unsafe_allow_html=True)
+# Re-emitted every run: elements a rerun doesn't emit are dropped by Streamlit
+st.markdown(f"<style>\n{_load_css()}</style>", unsafe_allow_html=True)
 
 
 
@@ -582,12 +666,18 @@ with header_col1:
     """, unsafe_allow_html=True)
 
 with header_col2:
-    if st.session_state.current_patient_id:
-        active_patient_opt = data.get_patient_by_id(st.session_state.current_patient_id)
-        p_name = active_patient_opt.get("name", "Unknown") if active_patient_opt else "Unknown"
-        st.markdown(f'<div style="text-align:right; color:#0369a1; font-weight:700; font-size:0.95rem; padding-top:1rem; background:rgba(224,242,254,0.6); border:1px solid #bae6fd; border-radius:0.6rem; padding:0.5rem 0.9rem; display:inline-block; backdrop-filter:blur(8px);">🩺 {p_name}</div>', unsafe_allow_html=True)
-    else:
-        st.markdown('<div style="text-align:right; color:#7dd3fc; font-style:italic; font-size:0.82rem; padding-top:1rem; letter-spacing:0.04em;">⟳ Listening for patient name…</div>', unsafe_allow_html=True)
+    badge_placeholder = st.empty()
+
+    def render_patient_badge():
+        """Draw the identified-patient badge into its slot, in place."""
+        if st.session_state.current_patient_id:
+            active_patient_opt = _patient_by_id(st.session_state.current_patient_id)
+            p_name = active_patient_opt.get("name", "Unknown") if active_patient_opt else "Unknown"
+            badge_placeholder.markdown(_BADGE_TMPL.substitute(name=escape_html(p_name)), unsafe_allow_html=True)
+        else:
+            badge_placeholder.markdown(_BADGE_LISTENING_HTML, unsafe_allow_html=True)
+
+    render_patient_badge()
 
 # ══════════════════════════════════════════════════════════════════════════════
 #  MAIN LAYOUT — grid-cols-5: 3/5 left, 2/5 right, gap-8
@@ -605,11 +695,11 @@ with col_left:
         if not items:
             return '<span style="color:#cbd5e1;font-size:0.82rem;">None recorded yet</span>'
         return "".join(
-            f'<span class="ph-chip {cls}">{icon + " " if icon else ""}{item}</span>'
+            f'<span class="ph-chip {cls}">{icon + " " if icon else ""}{escape_html(item)}</span>'
             for item in items
         )
 
-    def render_patient_history(is_live: bool = False):
+    def patient_history_html(is_live: bool = False) -> str:
         ph = st.session_state.patient_history
         has_data = bool(
             ph.symptoms or ph.risk_factors or ph.medications
@@ -636,40 +726,40 @@ with col_left:
             # ── Meta (duration / severity) ────────────────────────────────────
             meta_parts = []
             if ph.duration:
-                meta_parts.append(f'<span class="ph-meta-pill">⏱ Duration: <strong>{ph.duration}</strong></span>')
+                meta_parts.append(f'<span class="ph-meta-pill">⏱ Duration: <strong>{escape_html(ph.duration)}</strong></span>')
             if ph.severity:
-                meta_parts.append(f'<span class="ph-meta-pill">📊 Severity: <strong>{ph.severity}</strong></span>')
+                meta_parts.append(f'<span class="ph-meta-pill">📊 Severity: <strong>{escape_html(ph.severity)}</strong></span>')
             meta_html = "<div class='ph-meta-row'>" + "".join(meta_parts) + "</div>" if meta_parts else ""
 
             # ── Relevant history prose ────────────────────────────────────────
             hist_html = ""
             if ph.relevant_history:
-                hist_html = f'<div class="ph-history-box">{ph.relevant_history}</div>'
+                hist_html = f'<div class="ph-history-box">{escape_html(ph.relevant_history)}</div>'
 
-            content = '<div>' \
-                      '<div class="ph-label">Symptoms</div>' \
-                     f'<div class="ph-chips">{sym_html}</div>' \
-                      '</div>'
+            section = _PH_SECTION_TMPL.substitute
+            parts = [section(label="Symptoms", chips=sym_html)]
             if neg_html:
-                content += f'<div><div class="ph-label">Ruled Out</div><div class="ph-chips">{neg_html}</div></div>'
-            content += '<div>' \
-                       '<div class="ph-label">Risk Factors</div>' \
-                      f'<div class="ph-chips">{risk_html}</div>' \
-                       '</div>' \
-                       '<div>' \
-                       '<div class="ph-label">Current Medications</div>' \
-                      f'<div class="ph-chips">{med_html}</div>' \
-                       '</div>'
-            content += meta_html
+                parts.append(section(label="Ruled Out", chips=neg_html))
+            parts.append(section(label="Risk Factors", chips=risk_html))
+            parts.append(section(label="Current Medications", chips=med_html))
+            parts.append(meta_html)
             if hist_html:
-                content += f'<div><div class="ph-label">Clinical Summary</div>{hist_html}</div>'
+                parts.append(f'<div><div class="ph-label">Clinical Summary</div>{hist_html}</div>')
             if live_str:
-                content += f'<div style="margin-top:0.25rem;font-size:0.75rem;color:#94a3b8;">{live_str}</div>'
+                parts.append(f'<div style="margin-top:0.25rem;font-size:0.75rem;color:#94a3b8;">{live_str}</div>')
+            content = "".join(parts)
 
-        ph_placeholder.markdown(
-            f'<div class="ph-panel">{content}</div>',
-            unsafe_allow_html=True
-        )
+        return f'<div class="ph-panel">{content}</div>'
+
+    # Last HTML written into ph_placeholder during this script run
+    _ph_drawn = {"html": None}
+
+    def render_patient_history(is_live: bool = False):
+        """Write the panel into its slot, skipping the send if nothing changed."""
+        content = patient_history_html(is_live)
+        if content != _ph_drawn["html"]:
+            ph_placeholder.markdown(content, unsafe_allow_html=True)
+            _ph_drawn["html"] = content
 
     render_patient_history()
 
@@ -739,215 +829,79 @@ with col_left:
     # Render our custom native button and a script that explicitly forwards clicks
     # to the hidden WebRTC iframe's START button.
     
-    # Conditional styles based on fresh recording state
-    is_rec_str = str(is_recording).lower()
-    button_inner_radius = "8px" if is_recording else "50%"
-    button_inner_size = "24px" if is_recording else "32px"
-    pulse_animation = "animation: pulse-ring 2s cubic-bezier(0.215, 0.61, 0.355, 1) infinite;" if is_recording else ""
-    hover_scale = "1" if is_recording else "1.05"
-
-    st_html(f"""
-    <div class="btn-container">
-        <button id="aura-trigger" class="aura-record-btn" aria-label="Start Recording">
-            <div class="aura-record-inner"></div>
-        </button>
-    </div>
-    
-    <script>
-    // Actively seek out the WebRTC iframe and hide its container completely
-    function hideWebRTCNative() {{
-        const iframes = window.parent.document.querySelectorAll('iframe');
-        for (let iframe of iframes) {{
-            if (iframe.title && iframe.title.includes('webrtc')) {{
-                if (iframe.parentElement) {{
-                    iframe.parentElement.style.position = 'absolute';
-                    iframe.parentElement.style.opacity = '0';
-                    iframe.parentElement.style.pointerEvents = 'none';
-                    iframe.parentElement.style.height = '1px';
-                    iframe.parentElement.style.width = '1px';
-                    iframe.parentElement.style.overflow = 'hidden';
-                    iframe.parentElement.style.left = '-9999px';
-                }}
-            }}
-        }}
-    }}
-    hideWebRTCNative();
-    setInterval(hideWebRTCNative, 500);
-
-    document.getElementById('aura-trigger').addEventListener('click', function() {{
-        const iframes = window.parent.document.querySelectorAll('iframe');
-        for (let iframe of iframes) {{
-            if (iframe.title && iframe.title.includes('webrtc')) {{
-                try {{
-                    const doc = iframe.contentDocument || iframe.contentWindow.document;
-                    if (!doc) continue;
-                    const btns = doc.querySelectorAll('button');
-                    if (btns.length > 0) {{
-                        btns[0].click();
-                        return;
-                    }}
-                }} catch (e) {{}}
-            }}
-        }}
-    }});
-    </script>
-    
-    <style>
-    body {{ background: transparent !important; margin: 0; overflow: hidden; padding: 10px; }}
-    
-    @keyframes pulse-ring {{
-        0% {{ box-shadow: 0 0 0 0 rgba(239, 68, 68, 0.4); }}
-        70% {{ box-shadow: 0 0 0 20px rgba(239, 68, 68, 0); }}
-        100% {{ box-shadow: 0 0 0 0 rgba(239, 68, 68, 0); }}
-    }}
-
-    .aura-record-btn {{
-        width: 72px; 
-        height: 72px; 
-        border-radius: 50%; 
-        background: #ffffff;
-        border: 5px solid #1e293b; 
-        cursor: pointer; 
-        padding: 0; 
-        margin: 10px auto;
-        display: flex; 
-        align-items: center; 
-        justify-content: center; 
-        transition: all 0.2s cubic-bezier(0.4, 0, 0.2, 1);
-        {pulse_animation}
-    }}
-
-    .aura-record-inner {{
-        width: {button_inner_size}; 
-        height: {button_inner_size}; 
-        border-radius: {button_inner_radius};
-        background: #ef4444; 
-        transition: all 0.3s cubic-bezier(0.4, 0, 0.2, 1);
-    }}
-
-    .aura-record-btn:hover {{ 
-        box-shadow: 0 0 0 6px rgba(239,68,68,0.15); 
-        transform: scale({hover_scale}); 
-    }}
-    
-    .btn-container {{ 
-        display: flex; 
-        justify-content: center; 
-        width: 100%; 
-        height: 100%; 
-        align-items: center; 
-    }}
-    </style>
-    """, height=120)
+    st_html(_record_button_html(is_recording), height=120)
 
     if webrtc_ctx.state.playing:
         status_placeholder = st.empty()
 
 # ─── RIGHT: DDx & Clinical Gaps (col-span-2) ────────────────────────────────
 with col_right:
-    payload: AuraUIPayload = st.session_state.ai_analysis
-
-    # ── DDx Tracker ──────────────────────────────────────────────────────────
-    st.markdown('<div class="section-title">Differential Diagnosis (DDx)</div>',
-                unsafe_allow_html=True)
-
-    visible_ddx = sorted(
-        [e for e in payload.ddx if e.confidence >= 1.0],
-        key=lambda e: e.confidence, reverse=True
-    )[:3]
-    if visible_ddx:
-        html = ""
+    ai_placeholder = st.empty()
+
+    def render_ai_panel():
+        payload: AuraUIPayload = st.session_state.ai_analysis
+
+        # ── DDx Tracker ──────────────────────────────────────────────────────────
+        # One st.markdown per section: each call is its own delta on the wire
+        visible_ddx = sorted(
+            [e for e in payload.ddx if e.confidence >= 1.0],
+            key=lambda e: e.confidence, reverse=True
+        )[:3]
+        cards = []
         for entry in visible_ddx:
             sev = entry.suspicion.value.lower()   # "high" / "medium" / "low"
             cls = sev if sev in ("high", "medium", "low") else "low"
-            pct = f"{entry.probability_pct:.1f}%"
-            html += f"""
-            <div class="ddx-card {cls}">
-                <div style="display:flex; flex-direction:column; gap:0.25rem;">
-                    <span class="condition">{entry.disease}</span>
-                    <span class="ddx-prob">{pct}</span>
-                </div>
-                <span class="ddx-badge {cls}">{entry.confidence:.1f}</span>
-            </div>"""
-        st.markdown(html, unsafe_allow_html=True)
-    else:
-        st.markdown("""
-        <div class="ddx-card low" style="opacity:.4; cursor:default">
-            <span class="condition" style="color:#94a3b8; font-weight:400">
-            Awaiting transcript data…</span>
-        </div>""", unsafe_allow_html=True)
-
-    # ── Clinical Gap / Follow-up Question ────────────────────────────────────
-    st.markdown("""
-    <div class="clinical-gap-header">
-        <span>💡</span> Clinical Gap Identified
-    </div>""", unsafe_allow_html=True)
-
-    if payload.follow_up_question:
+            cards.append((cls, entry.disease_html, entry.probability_pct, entry.confidence))
         st.markdown(
-            f'<div class="clinical-gap-card"><p>{payload.follow_up_question}</p></div>',
-            unsafe_allow_html=True)
-    else:
-        st.markdown("""
-        <div class="clinical-gap-card" style="opacity:.5">
-            <p>Clinical gaps will appear here as the consultation progresses.</p>
-        </div>""", unsafe_allow_html=True)
-
-    # ── Safety Issues ────────────────────────────────────────────────────────
-    if payload.safety_issues:
-        st.markdown("""
-        <div class="clinical-gap-header">
-            <span>⚠️</span> Safety Review
-        </div>""", unsafe_allow_html=True)
-        for issue in payload.safety_issues:
-            st.markdown(f"""
-            <div class="ddx-card high">
-                <span class="condition">{issue}</span>
-            </div>""", unsafe_allow_html=True)
-
-    # ── Per-Disease Questions (QuestionGenie) ────────────────────────────────
-    if payload.questions_by_disease:
-        TARGET_COLORS = {
-            "rule_in":      ("#dcfce7", "#166534", "#86efac"),
-            "rule_out":     ("#fff1f2", "#9f1239", "#fecdd3"),
-            "differentiate":("#e0f2fe", "#0369a1", "#7dd3fc"),
-        }
-
-        # Build one HTML block — hover reveals questions (no click needed)
-        html = '<div class="clinical-gap-header"><span>❓</span> Targeted Questions</div>'
-        html += '<style>'
-        html += '.dq-card{position:relative;margin-bottom:0.55rem;border-radius:0.85rem;border:1px solid rgba(186,230,253,0.7);background:rgba(255,255,255,0.88);overflow:hidden;transition:box-shadow .25s,transform .25s;backdrop-filter:blur(10px);}'
-        html += '.dq-card:hover{box-shadow:0 6px 20px rgba(14,165,233,0.12);transform:translateX(3px);}'
-        html += '.dq-header{display:flex;align-items:center;gap:0.5rem;padding:0.7rem 1rem;font-size:0.85rem;font-weight:700;color:#0369a1;cursor:default;border-bottom:1px solid rgba(186,230,253,0);transition:border-color .25s;}'
-        html += '.dq-card:hover .dq-header{border-bottom-color:rgba(186,230,253,0.5);}'
-        html += '.dq-questions{max-height:0;overflow:hidden;transition:max-height .38s ease,padding .2s;}'
-        html += '.dq-card:hover .dq-questions{max-height:600px;padding-bottom:0.8rem;}'
-        html += '.dq-q{margin:0.35rem 0.75rem 0;padding:0.6rem 0.9rem;border-radius:0.6rem;border:1px solid;}'
-        html += '.dq-q-text{font-weight:600;font-size:0.85rem;margin-bottom:0.25rem;}'
-        html += '.dq-q-rationale{font-size:0.77rem;color:#475569;line-height:1.55;}'
-        html += '.dq-q-tag{font-size:0.64rem;font-weight:800;text-transform:uppercase;letter-spacing:.07em;margin-top:0.4rem;display:inline-block;padding:0.12rem 0.4rem;border-radius:4px;background:rgba(0,0,0,0.06);}'
-        html += '</style>'
-
-        for dq in payload.questions_by_disease:
-            html += f'<div class="dq-card"><div class="dq-header">🔬 {dq.disease}</div><div class="dq-questions">'
-            for q in dq.questions:
-                bg, fg, border = TARGET_COLORS.get(q.target.value, ("#f1f5f9", "#334155", "#e2e8f0"))
-                label = q.target.value.replace("_", " ")
-                html += (
-                    f'<div class="dq-q" style="background:{bg};border-color:{border};">'
-                    f'<div class="dq-q-text" style="color:{fg};">{q.question}</div>'
-                    f'<div class="dq-q-rationale">{q.clinical_rationale}</div>'
-                    f'<span class="dq-q-tag" style="color:{fg};">{label}</span>'
-                    f'</div>'
-                )
-            html += '</div></div>'
+            '<div class="section-title">Differential Diagnosis (DDx)</div>'
+            + _ddx_cards_html(tuple(cards)),
+            unsafe_allow_html=True,
+        )
 
-        st.markdown(html, unsafe_allow_html=True)
+        # ── Clinical Gap / Follow-up Question ────────────────────────────────────
+        if payload.follow_up_question:
+            gap_card = _GAP_CARD_TPL.format(text=payload.follow_up_html)
+        else:
+            gap_card = _GAP_EMPTY_HTML
+        st.markdown(_GAP_HEADER_HTML + gap_card, unsafe_allow_html=True)
+
+        # ── Safety Issues ────────────────────────────────────────────────────────
+        if payload.safety_issues:
+            st.markdown(
+                _SAFETY_HEADER_HTML
+                + "".join(_SAFETY_CARD_TPL.format(issue=i) for i in payload.safety_issues_html),
+                unsafe_allow_html=True,
+            )
 
-        # st.markdown strips <script> tags, so inject the scroll behaviour via
-        # st_html (components.v1.html), which runs inside its own iframe and can
-        # reach window.parent to query and scroll the main Streamlit frame.
-        st_html("""
+        # ── Per-Disease Questions (QuestionGenie) ────────────────────────────────
+        if payload.questions_by_disease:
+            # Build one HTML block — hover reveals questions (no click needed)
+            parts = ['<div class="clinical-gap-header"><span>❓</span> Targeted Questions</div>']
+            append = parts.append
+            render_q = _Q_TMPL.substitute
+            colors_of = _TARGET_COLORS.__getitem__
+
+            for dq in payload.questions_by_disease:
+                append(f'<div class="dq-card"><div class="dq-header">🔬 {dq.disease_html}</div><div class="dq-questions">')
+                for q in dq.questions:
+                    try:
+                        bg, fg, border = colors_of(q.target)
+                    except KeyError:
+                        bg, fg, border = _DEFAULT_TARGET_COLORS
+                    append(render_q(
+                        bg=bg, fg=fg, border=border,
+                        question=q.question_html,
+                        rationale=q.rationale_html,
+                        label=_TARGET_LABELS[q.target],
+                    ))
+                append('</div></div>')
+
+            st.markdown("".join(parts), unsafe_allow_html=True)
+
+            # st.markdown strips <script> tags, so inject the scroll behaviour via
+            # st_html (components.v1.html), which runs inside its own iframe and can
+            # reach window.parent to query and scroll the main Streamlit frame.
+            st_html("""
 <script>
 (function() {
     function attachScroll() {
@@ -978,132 +932,209 @@ with col_right:
 })();
 </script>
 """, height=0)
+
+    with ai_placeholder.container():
+        render_ai_panel()
+
+# State each panel was last drawn from during this script run. The patient
+# panel also tracks whether its live "Listening…" dot is showing.
+_drawn_versions = {
+    "ph": (st.session_state.ph_version, False),
+    "ai": st.session_state.ai_version,
+}
+
+
+def _refresh_panels() -> None:
+    """Redraw, in place, only the panels whose drawn state is out of date."""
+    # The live dot shows once any speech has been transcribed
+    ph_state = (st.session_state.ph_version, bool(st.session_state.transcript))
+    if ph_state != _drawn_versions["ph"]:
+        render_patient_history(is_live=ph_state[1])
+        _drawn_versions["ph"] = ph_state
+    if st.session_state.ai_version != _drawn_versions["ai"]:
+        with ai_placeholder.container():
+            render_ai_panel()
+        _drawn_versions["ai"] = st.session_state.ai_version
+
+
 if webrtc_ctx.state.playing:
     st.session_state.was_playing = True
     status_placeholder.info("Listening...")
 
     while webrtc_ctx.state.playing:
         if webrtc_ctx.audio_processor:
-            collected_text = False
+            text_queue = webrtc_ctx.audio_processor.text_queue
+
+            # Block on the queue rather than polling it: wake up as soon as
+            # speech arrives, or when a pending pipeline run falls due.
+            wait = QUEUE_WAIT_S
+            if st.session_state.pipeline_future is not None:
+                wait = FUTURE_POLL_S
+            elif st.session_state.chars_since_llm >= PIPELINE_BURST_CHARS:
+                wait = 0.0
+            elif (
+                st.session_state.chars_since_llm >= PIPELINE_MIN_CHARS
+                or st.session_state.salient_since_llm
+            ):
+                now = time.time()
+                since_run = now - st.session_state.last_pipeline_run
+                since_speech = now - st.session_state.last_speech_at
+                wait = min(wait, max(
+                    0.0,
+                    PIPELINE_INTERVAL_S - since_run,
+                    PIPELINE_DEBOUNCE_S - since_speech,
+                ))
+
+            items = []
             try:
+                items.append(text_queue.get(timeout=wait))
                 while True:
-                    text_item = webrtc_ctx.audio_processor.text_queue.get_nowait()
-                    if text_item and text_item.strip():
-                        st.session_state.transcript.append(text_item.strip() + " ")
-                        collected_text = True
+                    items.append(text_queue.get_nowait())
             except queue.Empty:
                 pass
 
-            if collected_text:
-                st.session_state.transcript_changed_since_llm = True
-                # Show live pulsing dot while accumulating speech
-                render_patient_history(is_live=True)
-
-            # Run the pipeline every 5 s if the transcript has new content
+            # One bulk extend for the whole batch rather than N appends
+            segments = [t.strip() + " " for t in items if t and t.strip()]
+            if segments:
+                new_text = "".join(segments)
+                st.session_state.transcript.extend(segments)
+                st.session_state.transcript_str += new_text
+                st.session_state.chars_since_llm += len(new_text)
+                st.session_state.last_speech_at = time.time()
+                if not st.session_state.salient_since_llm and _SALIENT.search(new_text):
+                    st.session_state.salient_since_llm = True
+                _trim_transcript()
+
+            # Pick up a finished background analysis, if any
+            new_analysis = _collect_analysis()
+            if new_analysis is not None:
+                status_placeholder.info("Listening...")
+
+            # Start the next run on a burst of new speech, or after
+            # PIPELINE_INTERVAL_S once something substantive (PIPELINE_MIN_CHARS
+            # or a _SALIENT cue) has been said and the
+            # speaker has paused for PIPELINE_DEBOUNCE_S — a mid-sentence
+            # run would be superseded a moment later. Never while a run is
+            # already in flight.
+            pending_chars = st.session_state.chars_since_llm
+            now = time.time()
             if (
-                st.session_state.transcript_changed_since_llm
-                and time.time() - st.session_state.last_pipeline_run >= 10.0
+                new_analysis is None
+                and st.session_state.pipeline_future is None
+                and (
+                    pending_chars >= PIPELINE_BURST_CHARS
+                    or (
+                        (pending_chars >= PIPELINE_MIN_CHARS or st.session_state.salient_since_llm)
+                        and now - st.session_state.last_pipeline_run >= PIPELINE_INTERVAL_S
+                        and now - st.session_state.last_speech_at >= PIPELINE_DEBOUNCE_S
+                    )
+                )
             ):
-                st.session_state.transcript_changed_since_llm = False
+                st.session_state.chars_since_llm = 0
+                st.session_state.salient_since_llm = False
                 st.session_state.last_pipeline_run = time.time()
-                status_placeholder.info("AI is analysing consultation...")
-
-                # use real transcript
-                full_transcript = "".join(st.session_state.transcript)
-                new_analysis = st.session_state.pipeline.run(full_transcript)
-                print("new_analysis", new_analysis)
-
-                # ── Always sync PatientHistory — even when updateUi is False ──
-                new_ph = new_analysis.patient_history
-                
-                # ── Identity Extraction Logic ──
-                if st.session_state.current_patient_id is None and new_ph.patient_name:
-                    extracted_name = new_ph.patient_name.lower().strip()
-                    all_patients = data.get_all_patients()
-                    matched_id = None
-                    print(f"[PatientMatch] Extracted name: '{extracted_name}'")
-                    for p in all_patients:
-                        db_name = p.get("name", "").lower()
-                        db_first = db_name.split()[0] if db_name else ""
-                        extracted_first = extracted_name.split()[0] if extracted_name else ""
-                        print(f"[PatientMatch]   Checking against: '{db_name}' (id={p.get('id')})")
-                        if (extracted_name in db_name
-                            or db_name in extracted_name
-                            or extracted_first == db_first):
-                            matched_id = p.get("id")
-                            print(f"[PatientMatch]   ✅ MATCHED → id='{matched_id}'")
-                            break
-                    
-                    if matched_id:
-                        st.session_state.current_patient_id = matched_id
-                        matched_patient_data = data.get_patient_by_id(matched_id)
-                        
-                        from backend.schemas import PatientHistory as _PH
-                        # Carry forward ALL existing clinical data from the transcript
-                        old_ph = st.session_state.patient_history
-                        ph = _PH()
-                        if matched_patient_data:
-                            ph.patient_name = new_ph.patient_name
-                            # Keep symptoms extracted from the conversation
-                            ph.symptoms = list(set(new_ph.symptoms or old_ph.symptoms))
-                            ph.negated_symptoms = list(set(new_ph.negated_symptoms or old_ph.negated_symptoms))
-                            ph.duration = new_ph.duration or old_ph.duration
-                            ph.severity = new_ph.severity or old_ph.severity
-                            # Merge risk factors from JSON + any extracted from conversation
-                            ph.risk_factors = list(set(
-                                matched_patient_data.get("past_medical_history", [])
-                                + (new_ph.risk_factors or [])
-                            ))
-                            ph.medications = matched_patient_data.get("current_medications", [])
-                            ph.relevant_history = f"**{matched_patient_data.get('name', 'Unknown')}** ({matched_patient_data.get('age', 'N/A')} {matched_patient_data.get('gender', 'N/A')}). "
-                            if matched_patient_data.get("allergies") and matched_patient_data["allergies"] != ["None"]:
-                                ph.relevant_history += f"Allergies: {', '.join(matched_patient_data['allergies'])}. "
-                            # Include past visit history for cross-visit intelligence
-                            past_visits = matched_patient_data.get("past_visits", [])
-                            if past_visits:
-                                ph.relevant_history += "Previous visits: "
-                                for visit in past_visits:
-                                    ph.relevant_history += (
-                                        f"[{visit.get('date', 'N/A')}] "
-                                        f"{visit.get('chief_complaint', '')} → "
-                                        f"Dx: {visit.get('diagnosis', '')}. "
-                                        f"Tx: {visit.get('treatment', '')}. "
-                                    )
-                            # Append the AI-generated clinical summary if available
-                            if new_ph.relevant_history:
-                                ph.relevant_history += new_ph.relevant_history
-                                
-                        st.session_state.patient_history = ph
-                        st.session_state.pipeline = AuraPipeline(initial_history=st.session_state.patient_history)
-                        # Re-run pipeline with full transcript so DDx uses medication context
-                        full_transcript = "".join(st.session_state.transcript)
-                        if full_transcript.strip():
-                            rerun_analysis = st.session_state.pipeline.run(full_transcript)
-                            if rerun_analysis.updateUi:
-                                st.session_state.ai_analysis = rerun_analysis
-                        st.rerun()
-                
-                if new_ph != st.session_state.patient_history:
-                    st.session_state.patient_history = new_ph
-                    # Update the panel immediately so the doctor sees it
-                    # without waiting for a full st.rerun()
-                    render_patient_history(is_live=True)
-
-                if new_analysis.updateUi:
-                    # Merge DDx — never cancel existing diagnoses
-                    merged_ddx = _merge_ddx(
-                        existing=st.session_state.ai_analysis.ddx,
-                        incoming=new_analysis.ddx,
-                    )
-                    new_analysis = new_analysis.model_copy(
-                        update={"ddx": merged_ddx}
-                    )
-                    st.session_state.ai_analysis = new_analysis
-                    payload = st.session_state.ai_analysis
-
-                # Rerun to refresh full UI (DDx, questions, etc.)
-                st.rerun()
+                # An unchanged transcript is skipped and the banner stays put
+                if _start_analysis(st.session_state.transcript_str):
+                    status_placeholder.info("AI is analysing consultation...")
+
+            if new_analysis is None:
+                # Still running, skipped, or nothing due this tick — only the
+                # live dot may need drawing
+                _refresh_panels()
+                continue
+
+            # Lazy %-formatting: the payload repr is only built at DEBUG
+            logger.debug("new_analysis %r", new_analysis)
+
+            # ── Always sync PatientHistory — even when updateUi is False ──
+            new_ph = new_analysis.patient_history
+            # The pipeline stamps every changed history with a new version
+            ph_changed = new_ph._version != st.session_state.patient_history._version
+
+            if not (new_analysis.updateUi or ph_changed):
+                # Nothing new: identity was already tried on this history and
+                # there is no DDx to merge
+                _refresh_panels()
+                continue
+
+            # ── Identity Extraction Logic ──
+            if st.session_state.current_patient_id is None and new_ph.patient_name:
+                extracted_name = new_ph.patient_name.lower().strip()
+                matched_id = _match_patient_id(
+                    extracted_name, st.session_state.patient_name_index
+                )
+                logger.debug("PatientMatch: extracted name %r → id=%r", extracted_name, matched_id)
+
+                if matched_id:
+                    st.session_state.current_patient_id = matched_id
+                    matched_patient_data = _patient_by_id(matched_id)
+
+                    from backend.schemas import PatientHistory as _PH
+                    # Carry forward ALL existing clinical data from the transcript
+                    old_ph = st.session_state.patient_history
+                    ph = _PH()
+                    if matched_patient_data:
+                        ph.patient_name = new_ph.patient_name
+                        # Keep symptoms extracted from the conversation
+                        ph.symptoms = list(set(new_ph.symptoms or old_ph.symptoms))
+                        ph.negated_symptoms = list(set(new_ph.negated_symptoms or old_ph.negated_symptoms))
+                        ph.duration = new_ph.duration or old_ph.duration
+                        ph.severity = new_ph.severity or old_ph.severity
+                        # Merge risk factors from JSON + any extracted from conversation
+                        ph.risk_factors = list(set(
+                            matched_patient_data.get("past_medical_history", [])
+                            + (new_ph.risk_factors or [])
+                        ))
+                        ph.medications = matched_patient_data.get("current_medications", [])
+                        ph.relevant_history = _patient_summary(matched_id)
+                        # Append the AI-generated clinical summary if available
+                        if new_ph.relevant_history:
+                            ph.relevant_history += new_ph.relevant_history
+
+                    st.session_state.patient_history = ph
+                    st.session_state.ph_version += 1
+                    # Keep the loaded diagnosis agent — only the history changes
+                    st.session_state.pipeline.set_history(ph)
+                    # Re-run pipeline with full transcript so DDx uses medication
+                    # context. It runs on the background executor like any other
+                    # run; the current panel and DDx stay up until it lands, and
+                    # if it carries a DDx that replaces (not merges into) the
+                    # old differential — see _collect_analysis.
+                    full_transcript = st.session_state.transcript_str
+                    if full_transcript.strip():
+                        st.session_state.last_transcript_hash = b""
+                        st.session_state.chars_since_llm = 0
+                        st.session_state.last_pipeline_run = time.time()
+                        if _start_analysis(full_transcript):
+                            st.session_state.ddx_replace_future = st.session_state.pipeline_future
+                            status_placeholder.info("AI is analysing consultation...")
+                    # Redraw the header badge and panels in place — no full
+                    # rerun. Skip the generic sync below: new_ph predates the
+                    # merged history just installed.
+                    render_patient_badge()
+                    _refresh_panels()
+                    continue
+
+            if ph_changed:
+                st.session_state.patient_history = new_ph
+                st.session_state.ph_version += 1
+
+            if new_analysis.updateUi:
+                # Merge DDx — never cancel existing diagnoses
+                merged_ddx = _merge_ddx(
+                    st.session_state.ddx_by_condition,
+                    incoming=new_analysis.ddx,
+                )
+                new_analysis = new_analysis.model_copy(
+                    update={"ddx": merged_ddx}
+                )
+                st.session_state.ai_analysis = new_analysis
+                st.session_state.ai_version += 1
 
-        time.sleep(0.1)
+            # Refresh only the panels that changed — no full-script rerun
+            _refresh_panels()
+        else:
+            # Processor not attached yet — no queue to block on
+            time.sleep(0.1)
 else:
     st.session_state.was_playing = False
@@ -8,9 +8,16 @@ load_dotenv()
 
 MODEL_NAME = 'NVFP4/Qwen3-235B-A22B-Instruct-2507-FP4'
 
+# The SDK default timeout is 10 minutes — bound it so a stuck socket can't
+# hang the caller; max_retries backs off on 429/5xx and connection errors.
+_TIMEOUT = 60.0
+_MAX_RETRIES = 2
+
 _client = OpenAI(
     base_url='https://hackeurope.crusoecloud.com/v1/',
     api_key=os.getenv("CRUSOE_API_KEY"),
+    timeout=_TIMEOUT,
+    max_retries=_MAX_RETRIES,
 )
 
 def _get_client():
@@ -22,6 +29,8 @@ def _get_client():
         _client = OpenAI(
             base_url='https://hackeurope.crusoecloud.com/v1/',
             api_key=api_key,
+            timeout=_TIMEOUT,
+            max_retries=_MAX_RETRIES,
         )
     return _client
 
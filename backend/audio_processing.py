@@ -1,22 +1,27 @@
 import os
-import io
 import queue
-import wave
-import requests
 import av
-import numpy as np
-import websocket
-import json
 import threading
-import base64
-import ssl
 
 # ---- WebRTC Audio Streaming Processor (Mistral Realtime) ----
 import asyncio
+from dotenv import load_dotenv
+
+load_dotenv()
+
+# Resolved once at import rather than per processor / per stream
+MISTRAL_API_KEY = os.getenv("MISTRAL_API_KEY", "")
+MISTRAL_STT_MODEL = "voxtral-mini-transcribe-realtime-2602"
+
+# WebRTC delivers ~20 ms frames; coalesce them into chunks of this length
+# before handing them to the stream (one queue hop + ws message per chunk).
+STREAM_CHUNK_MS = 100
 
 class AudioStreamingProcessor:
     def __init__(self):
-        self.text_queue = queue.Queue()
+        # SimpleQueue: single producer (stream task) / single consumer (UI loop),
+        # no task_done/join bookkeeping needed, cheaper put/get than Queue.
+        self.text_queue = queue.SimpleQueue()
         
         # Standardize audio to 16kHz, 16-bit PCM, Mono for Mistral Realtime
         self.sample_rate = 16000
@@ -26,7 +31,11 @@ class AudioStreamingProcessor:
             rate=self.sample_rate
         )
         
-        self.api_key = os.getenv("MISTRAL_API_KEY", "")
+        # s16 mono → 2 bytes per sample
+        self._chunk_bytes = self.sample_rate * 2 * STREAM_CHUNK_MS // 1000
+        self._pending = bytearray()
+
+        self.api_key = MISTRAL_API_KEY
         self.client = None
         self.is_ready = False
         self.audio_queue = None
@@ -58,8 +67,15 @@ class AudioStreamingProcessor:
 
     def __del__(self):
         if self.is_ready and self.audio_queue and self.loop:
-            # Send sentinel to stop the async generator cleanly
-            asyncio.run_coroutine_threadsafe(self.audio_queue.put(None), self.loop)
+            # Flush the partial chunk, then send sentinel to stop the async
+            # generator cleanly
+            if self._pending:
+                self._submit(bytes(self._pending))
+            self._submit(None)
+
+    def _submit(self, chunk: bytes | None) -> None:
+        """Hand a chunk to the stream's asyncio queue from the WebRTC thread."""
+        self.loop.call_soon_threadsafe(self.audio_queue.put_nowait, chunk)
 
     async def _queue_audio_iter(self):
         """Yield audio chunks from a queue until a None sentinel is received."""
@@ -89,7 +105,7 @@ class AudioStreamingProcessor:
             print("[Mistral] Starting realtime transcription stream...")
             async for event in self.client.audio.realtime.transcribe_stream(
                 audio_stream=audio_stream,
-                model="voxtral-mini-transcribe-realtime-2602",
+                model=MISTRAL_STT_MODEL,
                 audio_format=audio_format,
             ):
                 if isinstance(event, RealtimeTranscriptionSessionCreated):
@@ -117,9 +133,16 @@ class AudioStreamingProcessor:
                 resampled_frames = self.resampler.resample(frame)
                 
                 for r_frame in resampled_frames:
-                    raw_data = r_frame.to_ndarray().tobytes()
+                    # Copy straight out of the frame's plane buffer (s16 mono:
+                    # 2 bytes per sample; the plane may carry alignment padding)
+                    # rather than via an intermediate ndarray.
+                    self._pending += memoryview(r_frame.planes[0])[: r_frame.samples * 2]
+
+                if len(self._pending) >= self._chunk_bytes:
+                    chunk = bytes(self._pending)
+                    self._pending.clear()
                     # Push to async queue safely from sync WebRTC thread
-                    asyncio.run_coroutine_threadsafe(self.audio_queue.put(raw_data), self.loop)
+                    self._submit(chunk)
                     
             except Exception as e:
                 print(f"[Mistral] recv processing error: {e}")
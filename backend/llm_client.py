@@ -13,7 +13,8 @@ import json
 import logging
 import os
 import asyncio
-from typing import Any
+import weakref
+from typing import Any, Awaitable, TypeVar
 
 import httpx
 from dotenv import load_dotenv
@@ -32,12 +33,85 @@ CRUSOE_BASE_URL: str = os.getenv(
     "https://hackeurope.crusoecloud.com/v1",
 )
 CRUSOE_MODEL: str = os.getenv("CRUSOE_MODEL", "NVFP4/Qwen3-235B-A22B-Instruct-2507-FP4")
+# Most requests allowed in flight at once per event loop; callers beyond this
+# queue for a pooled connection instead of tripping the provider's 429 limit.
+CRUSOE_MAX_CONCURRENCY: int = int(os.getenv("CRUSOE_MAX_CONCURRENCY", "8"))
 
 _HEADERS: dict[str, str] = {
     "Authorization": f"Bearer {CRUSOE_API_KEY}",
     "Content-Type": "application/json",
 }
 
+# ---------------------------------------------------------------------------
+# Pooled HTTP client
+# ---------------------------------------------------------------------------
+
+# Fail fast on an unreachable host, but give the model its full generation time.
+# The pool timeout bounds how long a call queues behind the concurrency cap.
+_TIMEOUT = httpx.Timeout(60.0, connect=5.0, pool=30.0)
+
+# max_connections doubles as the concurrency cap: a request that finds the
+# pool full waits (up to the client timeout) for a free connection.
+_LIMITS = httpx.Limits(
+    max_connections=CRUSOE_MAX_CONCURRENCY,
+    max_keepalive_connections=CRUSOE_MAX_CONCURRENCY,
+)
+
+# httpx connections are bound to the event loop that opened them, so keep one
+# client per loop. Callers that reuse a loop (see AuraPipeline) reuse its
+# keep-alive connections and skip the TCP+TLS handshake on every call.
+_CLIENTS: weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient] = (
+    weakref.WeakKeyDictionary()
+)
+
+
+def _get_client() -> httpx.AsyncClient:
+    """Return the pooled client for the running event loop, creating it on first use."""
+    loop = asyncio.get_running_loop()
+    client = _CLIENTS.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(timeout=_TIMEOUT, limits=_LIMITS)
+        _CLIENTS[loop] = client
+    return client
+
+
+async def aclose_client() -> None:
+    """Close the running loop's pooled client (and its sockets), if one was opened."""
+    client = _CLIENTS.pop(asyncio.get_running_loop(), None)
+    if client is not None:
+        await client.aclose()
+
+
+_T = TypeVar("_T")
+
+
+def run_sync(awaitable: Awaitable[_T]) -> _T:
+    """
+    Run *awaitable* to completion in a fresh event loop, like asyncio.run, but
+    close that loop's pooled client before the loop goes away — otherwise each
+    blocking wrapper call would leak a client and its open connections.
+    """
+    async def _main() -> _T:
+        try:
+            return await awaitable
+        finally:
+            await aclose_client()
+
+    return asyncio.run(_main())
+
+
+async def warm_up() -> None:
+    """
+    Open a keep-alive connection to the LLM endpoint ahead of the first call,
+    so the first transcript analysis doesn't pay the TCP+TLS handshake.
+    Best-effort: failures are logged and otherwise ignored.
+    """
+    try:
+        await _get_client().head(CRUSOE_BASE_URL, timeout=3.0)
+    except httpx.HTTPError as exc:
+        logger.debug("LLM connection warm-up failed: %s", exc)
+
+
 # ---------------------------------------------------------------------------
 # Core async caller
 # ---------------------------------------------------------------------------
@@ -80,44 +154,44 @@ async def call_llm(
         payload["response_format"] = {"type": response_format}
 
     last_error: Exception | None = None
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        for attempt in range(retries + 1):
-            try:
-                response = await client.post(
-                    f"{CRUSOE_BASE_URL}/chat/completions",
-                    headers=_HEADERS,
-                    json=payload,
+    client = _get_client()
+    for attempt in range(retries + 1):
+        try:
+            response = await client.post(
+                f"{CRUSOE_BASE_URL}/chat/completions",
+                headers=_HEADERS,
+                json=payload,
+            )
+
+            if not response.is_success:
+                body = response.text[:800]
+                logger.error(
+                    "Crusoe API error %s: %s", response.status_code, body
                 )
 
-                if not response.is_success:
-                    body = response.text[:800]
-                    logger.error(
-                        "Crusoe API error %s: %s", response.status_code, body
-                    )
-
-                # --- 429 rate-limit: back off and retry ---
-                if response.status_code == 429:
-                    retry_after = float(
-                        response.headers.get("Retry-After", 0) or 0
-                    )
-                    wait = retry_after if retry_after > 0 else (2.0 ** attempt)
-                    logger.warning(
-                        "Rate limited (429). Waiting %.1fs before retry %d/%d ...",
-                        wait, attempt + 1, retries,
-                    )
-                    await asyncio.sleep(wait)
-                    last_error = RuntimeError(f"429 Too Many Requests (attempt {attempt+1})")
-                    continue   # retry without raising
-
-                response.raise_for_status()
-                data = response.json()
-                raw_text: str = data["choices"][0]["message"]["content"]
-                return json.loads(raw_text)
-
-            except (httpx.HTTPStatusError, httpx.RequestError, json.JSONDecodeError) as exc:
-                last_error = exc
-                if attempt < retries:
-                    await asyncio.sleep(2.0 ** attempt)
+            # --- 429 rate-limit: back off and retry ---
+            if response.status_code == 429:
+                retry_after = float(
+                    response.headers.get("Retry-After", 0) or 0
+                )
+                wait = retry_after if retry_after > 0 else (2.0 ** attempt)
+                logger.warning(
+                    "Rate limited (429). Waiting %.1fs before retry %d/%d ...",
+                    wait, attempt + 1, retries,
+                )
+                await asyncio.sleep(wait)
+                last_error = RuntimeError(f"429 Too Many Requests (attempt {attempt+1})")
+                continue   # retry without raising
+
+            response.raise_for_status()
+            data = response.json()
+            raw_text: str = data["choices"][0]["message"]["content"]
+            return json.loads(raw_text)
+
+        except (httpx.HTTPStatusError, httpx.RequestError, json.JSONDecodeError) as exc:
+            last_error = exc
+            if attempt < retries:
+                await asyncio.sleep(2.0 ** attempt)
 
     raise RuntimeError(
         f"LLM call failed after {retries + 1} attempts: {last_error}"
@@ -134,4 +208,4 @@ def call_llm_sync(
     **kwargs: Any,
 ) -> dict[str, Any]:
     """Blocking version of `call_llm`. Runs the coroutine in a new event loop."""
-    return asyncio.run(call_llm(system_prompt, user_prompt, **kwargs))
+    return run_sync(call_llm(system_prompt, user_prompt, **kwargs))
@@ -7,6 +7,7 @@ from backend.schemas import PatientHistory, AuraUIPayload, DDxEntry, SuspicionLe
 from backend.triageGenie import update_patient_async
 from backend.questionGenie import generate_questions_async
 from backend.qaGenie import extract_qa_async
+from backend.llm_client import aclose_client, warm_up
 
 # FIX Bug 1: correct import path — agents/MedicalDiagnosisAgent.py, not backend/
 import agents  # noqa: F401  — ensures agents/ is on sys.path via agents/__init__.py
@@ -56,6 +57,40 @@ class AuraPipeline:
         # Initialise once — the scorer loads datasets and builds a semantic index.
         # This is the expensive step (~2-5 s); afterwards every run() call is fast.
         self._medical_ai = MedicalDiagnosisAgent(verbose=False)
+        # A long-lived loop (rather than asyncio.run per call) lets the pooled
+        # LLM client in llm_client keep its connections open between runs.
+        self._loop = asyncio.new_event_loop()
+
+    def warm_up(self) -> None:
+        """
+        Open the pooled LLM connection on this pipeline's loop ahead of the
+        first run.  Blocking (up to the connect timeout), so callers should
+        schedule it on the same worker that executes run(), not the UI thread.
+        """
+        self._loop.run_until_complete(warm_up())
+
+    def close(self) -> None:
+        """
+        Close the pooled LLM client and the pipeline's event loop.
+
+        Call from the worker that executes run(), once no run is in flight;
+        the pipeline cannot be used afterwards.  Safe to call twice.
+        """
+        if self._loop.is_closed():
+            return
+        self._loop.run_until_complete(aclose_client())
+        self._loop.close()
+
+    def set_history(self, patient_history: PatientHistory) -> None:
+        """
+        Replace the stored patient history without rebuilding the pipeline.
+
+        The diagnosis agent and its semantic index are kept; the next run()
+        re-scores from scratch against the new history.
+        """
+        patient_history._version = self.patient_history._version + 1
+        self.patient_history = patient_history
+        self._has_ddx = False
 
     # ------------------------------------------------------------------
     # Async entrypoint (preferred)
@@ -80,7 +115,13 @@ class AuraPipeline:
             extract_qa_async(full_transcript),
         )
 
+        # Carry the current version over before comparing: private attributes
+        # take part in equality, and a fresh model always starts at 0.
+        if updated_history is not self.patient_history:
+            updated_history._version = self.patient_history._version
         history_changed = updated_history != self.patient_history
+        if history_changed:
+            updated_history._version += 1
         self.patient_history = updated_history
 
         # Skip if: nothing new
@@ -119,7 +160,7 @@ class AuraPipeline:
         raw_candidates = self._medical_ai.get_candidates() or []
 
         ddx_entries = []
-        print("raw_candidates ", raw_candidates)
+        logger.debug("raw_candidates %r", raw_candidates)
         for i, c in enumerate(raw_candidates, start=1):
             if c.probability_label in ["Very High", "High"]:
                 susp = SuspicionLevel.HIGH
@@ -196,6 +237,6 @@ class AuraPipeline:
 
     def run(self, full_transcript: str) -> AuraUIPayload:
         """Blocking wrapper around run_async for non-async callers."""
-        return asyncio.run(self.run_async(full_transcript))
+        return self._loop.run_until_complete(self.run_async(full_transcript))
 
 
@@ -23,10 +23,9 @@ Returns [] if no Q&A pairs are found.
 
 from __future__ import annotations
 
-import asyncio
 import logging
 
-from .llm_client import call_llm
+from .llm_client import call_llm, run_sync
 from .prompts import QA_GENIE_SYSTEM, QA_GENIE_USER_TEMPLATE
 
 logger = logging.getLogger(__name__)
@@ -99,7 +98,7 @@ def extract_qa(transcript: str) -> list[dict]:
     -------
     list[dict]  — each dict has ``"question"`` and ``"answer"`` keys.
     """
-    return asyncio.run(extract_qa_async(transcript))
+    return run_sync(extract_qa_async(transcript))
 
 
 # ---------------------------------------------------------------------------
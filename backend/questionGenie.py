@@ -59,7 +59,7 @@ import json
 import logging
 from typing import Any
 
-from .llm_client import call_llm
+from .llm_client import call_llm, run_sync
 from .prompts import QUESTION_GENIE_SYSTEM, QUESTION_GENIE_USER_TEMPLATE
 
 logger = logging.getLogger(__name__)
@@ -230,7 +230,7 @@ def generate_questions(
     -------
     Structured result dict (see module docstring for schema).
     """
-    return asyncio.run(generate_questions_async(patient_history, candidate_diseases))
+    return run_sync(generate_questions_async(patient_history, candidate_diseases))
 
 
 # ---------------------------------------------------------------------------
@@ -12,8 +12,50 @@ validates against them.
 from __future__ import annotations
 
 from enum import Enum
-from typing import Optional
-from pydantic import BaseModel, Field
+from functools import cache, cached_property
+from typing import Any, Mapping, Optional
+from pydantic import BaseModel, Field, PrivateAttr
+
+
+# Escaping via str.translate is a single C-level pass over the string
+_HTML_ESCAPE_TABLE = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#x27;",
+})
+
+
+def escape_html(text: str) -> str:
+    """Escape text for injection into unsafe_allow_html markup (same output as html.escape)."""
+    return text.translate(_HTML_ESCAPE_TABLE)
+
+
+@cache
+def _cached_property_names(cls: type) -> tuple[str, ...]:
+    return tuple(
+        name
+        for klass in cls.__mro__
+        for name, attr in vars(klass).items()
+        if isinstance(attr, cached_property)
+    )
+
+
+class _HtmlViewsModel(BaseModel):
+    """
+    Base for models exposing cached ``*_html`` views of their text fields.
+
+    cached_property stores its value in the instance ``__dict__``, which
+    model_copy copies verbatim — so a copy with an updated field would keep
+    serving the old escaped text.  Drop the cached views on copy instead.
+    """
+
+    def model_copy(self, *, update: Mapping[str, Any] | None = None, deep: bool = False) -> _HtmlViewsModel:
+        copied = super().model_copy(update=update, deep=deep)
+        for name in _cached_property_names(type(self)):
+            copied.__dict__.pop(name, None)
+        return copied
 
 
 # ---------------------------------------------------------------------------
@@ -50,6 +92,10 @@ class PatientHistory(BaseModel):
     medications: list[str] = Field(default_factory=list)
     relevant_history: Optional[str] = None
 
+    # Bumped by AuraPipeline each time the history changes, so callers can
+    # detect an update with an int compare instead of a deep equality check.
+    _version: int = PrivateAttr(default=0)
+
     def to_json(self) -> str:
         """Convert the PatientHistory object to a JSON string."""
         return self.model_dump_json(indent=2, ensure_ascii=False)
@@ -60,7 +106,7 @@ class PatientHistory(BaseModel):
 # ---------------------------------------------------------------------------
 
 
-class DDxEntry(BaseModel):
+class DDxEntry(_HtmlViewsModel):
     """A single entry in the Differential Diagnosis list."""
 
     rank: int
@@ -71,6 +117,11 @@ class DDxEntry(BaseModel):
     key_supporting: list[str] = Field(default_factory=list)
     key_against: list[str] = Field(default_factory=list)
 
+    @cached_property
+    def disease_html(self) -> str:
+        """HTML-escaped disease name, computed once per instance."""
+        return escape_html(self.disease)
+
 class StrategistOutput(BaseModel):
     """Full output from the Strategist agent."""
 
@@ -99,21 +150,36 @@ class SafetyReviewerOutput(BaseModel):
 # ---------------------------------------------------------------------------
 
 
-class ClinicalQuestion(BaseModel):
+class ClinicalQuestion(_HtmlViewsModel):
     """One targeted question generated for a specific disease."""
 
     question: str
     clinical_rationale: str = ""   # LLM sometimes omits this — default to empty string
     target: QuestionTarget
 
+    @cached_property
+    def question_html(self) -> str:
+        """HTML-escaped question text, computed once per instance."""
+        return escape_html(self.question)
+
+    @cached_property
+    def rationale_html(self) -> str:
+        """HTML-escaped clinical rationale, computed once per instance."""
+        return escape_html(self.clinical_rationale)
 
-class DiseaseQuestions(BaseModel):
+
+class DiseaseQuestions(_HtmlViewsModel):
     """Questions generated for a single candidate disease."""
 
     disease: str
     questions: list[ClinicalQuestion] = Field(default_factory=list)
     error: Optional[str] = None   # populated only on LLM failure
 
+    @cached_property
+    def disease_html(self) -> str:
+        """HTML-escaped disease name, computed once per instance."""
+        return escape_html(self.disease)
+
 
 class QuestionGenieOutput(BaseModel):
     """Full output from the Question Genie function."""
@@ -127,7 +193,7 @@ class QuestionGenieOutput(BaseModel):
 # ---------------------------------------------------------------------------
 
 
-class AuraUIPayload(BaseModel):
+class AuraUIPayload(_HtmlViewsModel):
     """
     The single object sent to the Streamlit frontend on each transcript update.
 
@@ -147,3 +213,13 @@ class AuraUIPayload(BaseModel):
     approved_by_safety_reviewer: bool = True
     updateUi: bool = True
     confidence: float = 0.0 # confidence score between 0 and 1
+
+    @cached_property
+    def follow_up_html(self) -> str:
+        """HTML-escaped follow-up question, computed once per instance."""
+        return escape_html(self.follow_up_question)
+
+    @cached_property
+    def safety_issues_html(self) -> tuple[str, ...]:
+        """HTML-escaped safety issues, computed once per instance."""
+        return tuple(escape_html(issue) for issue in self.safety_issues)
@@ -59,12 +59,11 @@ Example
 
 from __future__ import annotations
 
-import asyncio
 import json
 import logging
 from typing import Any
 
-from .llm_client import call_llm
+from .llm_client import call_llm, run_sync
 from .prompts import TRIAGE_GENIE_SYSTEM, TRIAGE_GENIE_USER_TEMPLATE
 from .schemas import PatientHistory
 
@@ -202,7 +201,7 @@ def update_patient(
     -------
     PatientHistory with newly discovered information integrated.
     """
-    return asyncio.run(update_patient_async(patient, transcript))
+    return run_sync(update_patient_async(patient, transcript))
 
 
 # ---------------------------------------------------------------------------
@@ -1,69 +1,39 @@
 import os
-import time
 import queue
+from pathlib import Path
 import streamlit as st
-from dotenv import load_dotenv
 from streamlit_webrtc import webrtc_streamer, WebRtcMode
 from backend.audio_processing import AudioStreamingProcessor
+from backend.schemas import escape_html
 
-load_dotenv()
+# .env is loaded by backend.audio_processing on import
 
 st.set_page_config(page_title="Mistral Voice Test", page_icon="🎙️", layout="centered")
 
 # ── Styling ──────────────────────────────────────────────────────────────────
-st.markdown("""
-<style>
-@import url('https://fonts.googleapis.com/css2?family=Inter:wght@400;500;600;700;800&display=swap');
-html, body, * { font-family: 'Inter', sans-serif !important; }
-.stApp { background: linear-gradient(155deg, #0f172a 0%, #1e293b 50%, #0f172a 100%) !important; }
-[data-testid="stHeader"] { display: none !important; }
-#MainMenu, footer { visibility: hidden; }
-
-.title { text-align: center; margin-top: 2rem; }
-.title h1 {
-    font-size: 2.5rem; font-weight: 800;
-    background: linear-gradient(135deg, #38bdf8, #818cf8);
-    -webkit-background-clip: text; -webkit-text-fill-color: transparent;
-    letter-spacing: -0.03em;
-}
-.subtitle { text-align: center; color: #64748b; font-size: 0.85rem; margin-bottom: 2rem; }
-
-.transcript-box {
-    background: rgba(30, 41, 59, 0.8);
-    border: 1px solid rgba(56, 189, 248, 0.2);
-    border-radius: 1rem;
-    padding: 1.5rem 2rem;
-    min-height: 200px;
-    max-height: 400px;
-    overflow-y: auto;
-    color: #e2e8f0;
-    font-size: 1.05rem;
-    line-height: 1.8;
-    backdrop-filter: blur(12px);
-    box-shadow: 0 4px 24px rgba(0,0,0,0.3);
-}
-.transcript-box .placeholder { color: #475569; font-style: italic; }
-.transcript-box .word { color: #f1f5f9; }
-
-.status-bar {
-    text-align: center; margin-top: 1rem;
-    font-size: 0.8rem; font-weight: 600;
-    letter-spacing: 0.1em; text-transform: uppercase;
-}
-.status-live { color: #34d399; }
-.status-idle { color: #64748b; }
-
-.clear-btn { text-align: center; margin-top: 1rem; }
-</style>
-""", unsafe_allow_html=True)
+@st.cache_resource(show_spinner=False)
+def _load_css() -> str:
+    """Read the stylesheet once per process rather than re-parsing it each rerun."""
+    return (Path(__file__).parent / "static" / "voice_test.css").read_text(encoding="utf-8")
+
+
+st.markdown(f"<style>\n{_load_css()}</style>", unsafe_allow_html=True)
 
 # ── Header ───────────────────────────────────────────────────────────────────
 st.markdown('<div class="title"><h1>🎙️ Mistral Voice Test</h1></div>', unsafe_allow_html=True)
 st.markdown('<div class="subtitle">Powered by Voxtral Mini Transcribe Realtime</div>', unsafe_allow_html=True)
 
 # ── Session State ────────────────────────────────────────────────────────────
-if "full_transcript" not in st.session_state:
-    st.session_state.full_transcript = ""
+if "full_transcript_html" not in st.session_state:
+    # The transcript, stored already escaped and extended per segment so each
+    # word is escaped once instead of on every refresh
+    st.session_state.full_transcript_html = ""
+
+_TRANSCRIPT_TPL = '<div class="transcript-box"><span class="word">{text}</span></div>'
+# Long sessions only draw the tail of the transcript unless expanded
+_TRANSCRIPT_VIEW_CHARS = 4000
+if "show_full_transcript" not in st.session_state:
+    st.session_state.show_full_transcript = False
 
 # ── WebRTC Streamer ──────────────────────────────────────────────────────────
 webrtc_ctx = webrtc_streamer(
@@ -82,36 +52,56 @@ if is_recording:
 else:
     st.markdown('<div class="status-bar status-idle">○ Click START to begin</div>', unsafe_allow_html=True)
 
-# ── Drain text from the processor queue ──────────────────────────────────────
-if is_recording and webrtc_ctx.audio_processor:
-    processor = webrtc_ctx.audio_processor
-    try:
-        while True:
-            text = processor.text_queue.get_nowait()
-            if text:
-                st.session_state.full_transcript += text + " "
-    except queue.Empty:
-        pass
-
-# ── Transcript Display ──────────────────────────────────────────────────────
-transcript = st.session_state.full_transcript.strip()
-if transcript:
-    st.markdown(f'<div class="transcript-box"><span class="word">{transcript}</span></div>', unsafe_allow_html=True)
-else:
-    st.markdown(
-        '<div class="transcript-box"><span class="placeholder">'
-        'Your transcription will appear here as you speak...</span></div>',
-        unsafe_allow_html=True,
+# ── Live transcript (fragment) ──────────────────────────────────────────────
+def live_transcript():
+    """Drain the processor queue and draw the transcript box."""
+    if is_recording and webrtc_ctx.audio_processor:
+        processor = webrtc_ctx.audio_processor
+        chunks = []
+        try:
+            while True:
+                text = processor.text_queue.get_nowait()
+                if text:
+                    chunks.append(text + " ")
+        except queue.Empty:
+            pass
+        if chunks:
+            st.session_state.full_transcript_html += "".join(map(escape_html, chunks))
+
+    transcript = st.session_state.full_transcript_html.strip()
+    clipped = (
+        len(transcript) > _TRANSCRIPT_VIEW_CHARS
+        and not st.session_state.show_full_transcript
     )
+    if clipped:
+        # Cut on a space so no escaped entity (&amp; …) is split
+        tail = transcript[-_TRANSCRIPT_VIEW_CHARS:]
+        transcript = "… " + tail[tail.find(" ") + 1:]
+    if transcript:
+        st.markdown(_TRANSCRIPT_TPL.format(text=transcript), unsafe_allow_html=True)
+        if clipped and st.button("Show full transcript"):
+            st.session_state.show_full_transcript = True
+            st.rerun(scope="fragment")
+    else:
+        st.markdown(
+            '<div class="transcript-box"><span class="placeholder">'
+            'Your transcription will appear here as you speak...</span></div>',
+            unsafe_allow_html=True,
+        )
+
+
+# While recording, only this fragment re-executes every 0.5 s — the CSS, the
+# header and the WebRTC widget are left alone instead of a full st.rerun().
+st.fragment(run_every=0.5 if is_recording else None)(live_transcript)()
 
 # ── Clear Button ─────────────────────────────────────────────────────────────
+def clear_transcript():
+    # on_click runs before the script re-executes, so the transcript above is
+    # already empty on this run and no follow-up st.rerun() is needed.
+    st.session_state.full_transcript_html = ""
+    st.session_state.show_full_transcript = False
+
+
 col1, col2, col3 = st.columns([1, 1, 1])
 with col2:
-    if st.button("🗑️ Clear Transcript", use_container_width=True):
-        st.session_state.full_transcript = ""
-        st.rerun()
-
-# ── Auto-refresh while recording ────────────────────────────────────────────
-if is_recording:
-    time.sleep(0.5)
-    st.rerun()
+    st.button("🗑️ Clear Transcript", use_container_width=True, on_click=clear_transcript)